@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import random
+import logging
+import pstats
+import cProfile
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# cProfile allows one active profiler per interpreter on Python 3.12+, so only
+# one attempt per process is profiled at a time
+_profiling = threading.Lock()
+
+class _StackSampler(threading.Thread):
+    # Periodically samples one thread's Python stack into collapsed-stack counts
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+class AuthProfiler:
+    def __init__(self, output_dir='profiles', sample_rate=1.0, max_attempts=50,
+                 interval=0.005):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate  # Fraction of attempts that get profiled
+        self.max_attempts = max_attempts  # Oldest profiles are deleted past this
+        self.interval = interval  # Stack sampling period in seconds
+        # The output directory is created lazily in _save(), so a bad
+        # VOCALOCK_PROFILE_DIR can never stop an entry point from starting
+
+    @classmethod
+    def from_env(cls, enabled=False):
+        # VOCALOCK_PROFILE=1 turns profiling on; the other variables tune it
+        if not enabled and os.environ.get('VOCALOCK_PROFILE', '') not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            output_dir=os.environ.get('VOCALOCK_PROFILE_DIR', 'profiles'),
+            sample_rate=float(os.environ.get('VOCALOCK_PROFILE_SAMPLE', '1.0')),
+            max_attempts=int(os.environ.get('VOCALOCK_PROFILE_MAX', '50'))
+        )
+
+    def run(self, func, *args, **kwargs):
+        if random.random() >= self.sample_rate:
+            return func(*args, **kwargs)
+
+        # Attempts that overlap a profiled one run unprofiled instead of waiting
+        if not _profiling.acquire(blocking=False):
+            return func(*args, **kwargs)
+
+        name = f"attempt-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.perf_counter_ns()}"
+        profiler = cProfile.Profile()
+        sampler = _StackSampler(threading.get_ident(), self.interval)
+        enabled = False
+        try:
+            try:
+                sampler.start()
+                profiler.enable()
+                enabled = True
+            except Exception as e:
+                # Another profiling tool is active; run the attempt unprofiled
+                logger.warning("Profiling skipped for %s: %s", name, e)
+            return func(*args, **kwargs)
+        finally:
+            if enabled:
+                profiler.disable()
+            if sampler.is_alive():
+                sampler.stop()
+            _profiling.release()
+            if enabled:
+                self._save(name, profiler, sampler.counts)
+
+    def _save(self, name, profiler, counts):
+        # Profiling output is best effort and must never change the auth outcome
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.output_dir, name + '.prof'))
+            with open(os.path.join(self.output_dir, name + '.folded'), 'w') as f:
+                for stack, count in counts.most_common():
+                    f.write(f"{stack} {count}\n")
+            self._prune()
+        except Exception as e:
+            logger.warning("Could not write profile %s: %s", name, e)
+
+    def _prune(self):
+        # Keep the output directory bounded to the newest max_attempts profiles;
+        # other workers may delete files underneath us, so missing files are skipped
+        entries = []
+        for f in os.listdir(self.output_dir):
+            if f.endswith('.prof'):
+                try:
+                    mtime = os.path.getmtime(os.path.join(self.output_dir, f))
+                except FileNotFoundError:
+                    continue
+                entries.append((mtime, f[:-len('.prof')]))
+        entries.sort()
+        for _, name in entries[:max(0, len(entries) - self.max_attempts)]:
+            for ext in ('.prof', '.folded'):
+                try:
+                    os.remove(os.path.join(self.output_dir, name + ext))
+                except FileNotFoundError:
+                    pass
+
+    def top_functions(self, limit=20, sort='cumulative'):
+        # Aggregate every stored attempt into one set of stats
+        if not os.path.isdir(self.output_dir):
+            return []
+        paths = sorted(
+            os.path.join(self.output_dir, f)
+            for f in os.listdir(self.output_dir) if f.endswith('.prof')
+        )
+        if not paths:
+            return []
+        stats = pstats.Stats(*paths)
+        stats.sort_stats(sort)
+
+        rows = []
+        for func in stats.fcn_list[:limit]:
+            _, ncalls, tottime, cumtime, _ = stats.stats[func]
+            filename, line, name = func
+            rows.append((f"{os.path.basename(filename)}:{line}({name})", ncalls, tottime, cumtime))
+        return rows
+
+    def merged_stacks(self):
+        # Combine every .folded file into one collapsed-stack Counter for flamegraph tools
+        counts = Counter()
+        if not os.path.isdir(self.output_dir):
+            return counts
+        for f in os.listdir(self.output_dir):
+            if f.endswith('.folded'):
+                with open(os.path.join(self.output_dir, f)) as fh:
+                    for line in fh:
+                        stack, _, count = line.rstrip('\n').rpartition(' ')
+                        if stack:
+                            counts[stack] += int(count)
+        return counts
+
+def maybe_profile(profiler, func, *args, **kwargs):
+    # Pass-through for call sites where profiling may be disabled (profiler is None)
+    if profiler is None:
+        return func(*args, **kwargs)
+    return profiler.run(func, *args, **kwargs)
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Summarize Vocal Lock authentication profiles")
+    parser.add_argument('output_dir', nargs='?', default=os.environ.get('VOCALOCK_PROFILE_DIR', 'profiles'))
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'ncalls'])
+    parser.add_argument('--folded', help="Write merged collapsed stacks to this file")
+    args = parser.parse_args()
+
+    profiler = AuthProfiler(args.output_dir)
+    rows = profiler.top_functions(args.limit, args.sort)
+    if not rows:
+        print(f"No profiles found in {args.output_dir}")
+        return
+
+    print(f"{'calls':>10} {'tottime':>10} {'cumtime':>10}  function")
+    for func, ncalls, tottime, cumtime in rows:
+        print(f"{ncalls:>10} {tottime:>10.3f} {cumtime:>10.3f}  {func}")
+
+    if args.folded:
+        with open(args.folded, 'w') as f:
+            for stack, count in profiler.merged_stacks().most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"Collapsed stacks written to {args.folded}")
+
+if __name__ == "__main__":
+    main()
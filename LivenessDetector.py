@@ -0,0 +1,157 @@
+import os
+import time
+import threading
+from collections import Counter, deque
+import numpy as np
+
+class LivenessDetector:
+    def __init__(self, max_clips=256, n_bands=17, fmin=300, fmax=3000,
+                 max_ber=0.25, min_overlap=32, max_candidates=8,
+                 max_flatness=0.35, min_low_ratio=0.016):
+        if not 3 <= n_bands <= 33:
+            # Sub-fingerprints are compared as 32-bit words
+            raise ValueError(f"n_bands must be between 3 and 33, got {n_bands}")
+        self.max_clips = max_clips  # Recently accepted clips kept in the index
+        self.n_bands = n_bands  # Bands per frame; gives n_bands - 1 fingerprint bits
+        self.fmin = fmin  # Fingerprint bands are log-spaced over the speech band
+        self.fmax = fmax
+        self.max_ber = max_ber  # Aligned bit error rate below this flags a replay
+        self.min_overlap = min_overlap  # Frames two clips must share before they are compared
+        self.max_candidates = max_candidates  # Alignments scored per query
+        self.max_flatness = max_flatness  # Mean in-band spectral flatness of live speech stays below this
+        self.min_low_ratio = min_low_ratio  # Loudspeakers lose energy below ~300Hz
+        self.bits = n_bands - 1
+        self._clips = deque()
+        self._codes = {}
+        self._index = {}
+        self._next_id = 0
+        self._lock = threading.Lock()  # One detector is shared by every session
+
+    @classmethod
+    def from_env(cls, enabled=False):
+        # VOCALOCK_LIVENESS=1 turns the anti-spoofing stage on
+        if not enabled and os.environ.get('VOCALOCK_LIVENESS', '') not in ('1', 'true', 'yes'):
+            return None
+        return cls()
+
+    def _band_energies(self, S, sample_rate):
+        # Collapse the magnitude spectrogram into log-spaced bands per frame
+        freqs = np.linspace(0, sample_rate / 2, S.shape[0])
+        edges = np.geomspace(self.fmin, min(self.fmax, sample_rate / 2), self.n_bands + 1)
+        bins = np.searchsorted(freqs, edges)
+        # Force strictly increasing edges so every band holds at least one bin
+        steps = np.arange(len(bins))
+        bins = np.maximum.accumulate(bins - steps) + steps
+        if bins[-1] > S.shape[0]:
+            raise ValueError("Spectrogram has too few bins for the fingerprint bands")
+        power = S ** 2
+        # The last edge only closes the final band; bins above fmax are never summed
+        return np.add.reduceat(power[:bins[-1]], bins[:-1], axis=0)
+
+    def fingerprint(self, S, sample_rate):
+        # Haitsma-Kalker sub-fingerprints: one bit per adjacent band pair, set when
+        # the band energy difference grows from the previous frame
+        E = self._band_energies(S, sample_rate)
+        if E.shape[1] < 2:
+            return np.zeros(0, dtype=np.int64)
+        diff = np.diff(E, axis=0)
+        bits = (diff[:, 1:] - diff[:, :-1]) > 0
+        weights = 1 << np.arange(bits.shape[0], dtype=np.int64)
+        return weights @ bits.astype(np.int64)
+
+    def _bit_error_rate(self, codes, stored, offset):
+        # Compare the query against the stored clip shifted by offset frames
+        start = max(0, -offset)
+        stop = min(len(codes), len(stored) - offset)
+        if stop - start < min(self.min_overlap, len(codes), len(stored)):
+            return 1.0
+        xor = np.bitwise_xor(codes[start:stop], stored[start + offset:stop + offset])
+        errors = np.unpackbits(xor.astype('>u4').view(np.uint8)).sum()
+        return float(errors) / ((stop - start) * self.bits)
+
+    def _replay_match(self, codes, username):
+        # Look up each frame and its single-bit neighbours, vote for clip
+        # alignments, then score the best alignments by bit error rate
+        if len(codes) == 0:
+            return 1.0
+        flips = [0] + [1 << b for b in range(self.bits)]
+        votes = Counter()
+        for q, code in enumerate(codes.tolist()):
+            for flip in flips:
+                for clip_id, frame in self._index.get(code ^ flip, ()):
+                    votes[clip_id, frame - q] += 1
+
+        best = 1.0
+        scored = 0
+        for (clip_id, offset), _ in votes.most_common():
+            clip_user, stored = self._codes[clip_id]
+            if clip_user != username:
+                continue
+            best = min(best, self._bit_error_rate(codes, stored, offset))
+            scored += 1
+            if best < self.max_ber or scored >= self.max_candidates:
+                break
+        return best
+
+    def check(self, S, sample_rate, username):
+        # S is the magnitude spectrogram already computed for feature extraction
+        start = time.perf_counter()
+
+        power = S ** 2 + 1e-10
+        freqs = np.linspace(0, sample_rate / 2, S.shape[0])
+
+        # Spectral flatness over fmin..fmax only: the input was bandpassed to
+        # 80-3000Hz, so the empty bins above would drag the mean towards zero
+        band = power[(freqs >= self.fmin) & (freqs <= self.fmax)]
+        flatness = np.exp(np.mean(np.log(band), axis=0)) / np.mean(band, axis=0)
+        mean_flatness = float(np.mean(flatness))
+
+        # Channel cue: share of energy below 300Hz
+        total = float(np.sum(power)) + 1e-10
+        low_ratio = float(np.sum(power[freqs < 300])) / total
+
+        codes = self.fingerprint(S, sample_rate)
+        with self._lock:
+            replay_ber = self._replay_match(codes, username)
+
+        stats = {
+            'flatness': mean_flatness,
+            'low_ratio': low_ratio,
+            'replay_ber': replay_ber,
+            'codes': codes,
+            'elapsed': time.perf_counter() - start
+        }
+
+        if replay_ber < self.max_ber:
+            return False, "Replay detected (matches a recently accepted clip)", stats
+        if mean_flatness > self.max_flatness:
+            return False, f"Liveness check failed (flatness={mean_flatness:.2f})", stats
+        if low_ratio < self.min_low_ratio:
+            return False, f"Liveness check failed (low-band ratio={low_ratio:.3f})", stats
+        return True, "Live", stats
+
+    def remember(self, username, codes):
+        # Index an accepted clip frame by frame so a later replay of it is rejected
+        if len(codes) == 0:
+            return
+        with self._lock:
+            self._remember(username, codes)
+
+    def _remember(self, username, codes):
+        clip_id = self._next_id
+        self._next_id += 1
+        self._clips.append(clip_id)
+        self._codes[clip_id] = (username, codes)
+        for frame, code in enumerate(codes.tolist()):
+            self._index.setdefault(code, []).append((clip_id, frame))
+
+        # Evict the oldest clip once the index is full
+        while len(self._clips) > self.max_clips:
+            old_id = self._clips.popleft()
+            _, old_codes = self._codes.pop(old_id)
+            for code in set(old_codes.tolist()):
+                entries = [e for e in self._index.get(code, ()) if e[0] != old_id]
+                if entries:
+                    self._index[code] = entries
+                else:
+                    self._index.pop(code, None)
@@ -0,0 +1,151 @@
+import os
+import time
+import sqlite3
+
+class RateLimiter:
+    def __init__(self, db_path='rate_limit.db', capacity=5, refill_rate=1 / 60,
+                 max_failures=3, lockout_time=300):
+        self.db_path = db_path
+        self.capacity = capacity  # Burst size of each token bucket
+        self.refill_rate = refill_rate  # Tokens regained per second
+        self.max_failures = max_failures
+        self.lockout_time = lockout_time  # Seconds a key stays locked out
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # Create the shared table; WAL lets readers and writers from other processes overlap
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    locked_until REAL NOT NULL DEFAULT 0
+                )
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # A fresh connection per call keeps the limiter safe to use after fork
+        # and from any thread; transactions are managed explicitly
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _keys(self, user_id, source_id):
+        keys = []
+        if user_id is not None:
+            keys.append(f"user:{user_id}")
+        if source_id is not None:
+            keys.append(f"source:{source_id}")
+        return keys
+
+    def _load(self, conn, key, now):
+        row = conn.execute(
+            "SELECT tokens, updated, failures, locked_until FROM buckets WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return float(self.capacity), 0, 0.0
+
+        tokens, updated, failures, locked_until = row
+        # Refill the bucket for the time elapsed since the last attempt
+        tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+        return tokens, failures, locked_until
+
+    def _store(self, conn, key, tokens, now, failures, locked_until):
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (key, tokens, updated, failures, locked_until) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, tokens, now, failures, locked_until)
+        )
+
+    def _denial(self, conn, keys, now):
+        # Returns (message, states); message is None when every key may proceed
+        states = {}
+        for key in keys:
+            tokens, failures, locked_until = self._load(conn, key, now)
+            if locked_until > now:
+                wait = int(locked_until - now) + 1
+                return f"Too many attempts. Please wait {wait}s.", states
+            if tokens < 1:
+                wait = int((1 - tokens) / self.refill_rate) + 1
+                return f"Rate limit exceeded. Please wait {wait}s.", states
+            states[key] = (tokens, failures)
+        return None, states
+
+    def check(self, user_id=None, source_id=None):
+        # Non-spending look-ahead so callers can bail out before recording audio
+        # or loading models; acquire() still makes the binding decision
+        conn = self._connect()
+        try:
+            message, _ = self._denial(conn, self._keys(user_id, source_id), time.time())
+        finally:
+            conn.close()
+        if message:
+            return False, message
+        return True, "OK"
+
+    def acquire(self, user_id=None, source_id=None):
+        # Must be called before any audio processing so throttled attempts cost nothing
+        now = time.time()
+        keys = self._keys(user_id, source_id)
+
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock up front so the check and
+            # the token spend are atomic across processes
+            conn.execute("BEGIN IMMEDIATE")
+            message, states = self._denial(conn, keys, now)
+            if message:
+                conn.execute("ROLLBACK")
+                return False, message
+
+            for key, (tokens, failures) in states.items():
+                self._store(conn, key, tokens - 1, now, failures, 0.0)
+            conn.execute("COMMIT")
+            return True, "OK"
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def record_result(self, success, user_id=None, source_id=None):
+        now = time.time()
+        keys = self._keys(user_id, source_id)
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for key in keys:
+                tokens, failures, locked_until = self._load(conn, key, now)
+                if success:
+                    failures = 0
+                else:
+                    failures += 1
+                    # Lock the key out once it reaches the failure limit
+                    if failures >= self.max_failures:
+                        locked_until = now + self.lockout_time
+                        failures = 0
+                self._store(conn, key, tokens, now, failures, locked_until)
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def reset(self, user_id=None, source_id=None):
+        conn = self._connect()
+        try:
+            for key in self._keys(user_id, source_id):
+                conn.execute("DELETE FROM buckets WHERE key = ?", (key,))
+        finally:
+            conn.close()
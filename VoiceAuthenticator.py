@@ -8,14 +8,26 @@ from pyAudioAnalysis import ShortTermFeatures
 from sklearn.metrics.pairwise import cosine_similarity
 from scipy.signal import butter, filtfilt
 import librosa
+import time
+import logging
+from LivenessDetector import LivenessDetector
+
+logger = logging.getLogger(__name__)
+
+def format_timings(timings):
+    # One-line per-stage report, e.g. "transcribe=812.4ms features=95.1ms liveness=1.9ms"
+    return ' '.join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in timings.items())
 
 class VoiceAuthenticator:
-    def __init__(self, storage_path='voice_data'):
+    def __init__(self, storage_path='voice_data', liveness=False):
         self.storage_path = storage_path
         self.json_file = os.path.join(storage_path, 'voice_data.json')
         self.model = whisper.load_model("base", device="cpu")
         self.base_threshold = 0.8
         self.adaptive_threshold = True
+        # Optional anti-spoofing stage run on the feature-extraction spectrogram
+        # (enabled by liveness=True or VOCALOCK_LIVENESS=1)
+        self.liveness_detector = LivenessDetector.from_env(enabled=liveness)
         os.makedirs(storage_path, exist_ok=True)
 
     def preprocess_audio(self, audio_data, sample_rate):
@@ -35,6 +47,10 @@ class VoiceAuthenticator:
         return audio_data
 
     def extract_features(self, audio_path):
+        features, _, _ = self._analyze(audio_path)
+        return features
+
+    def _analyze(self, audio_path):
         # Load and preprocess audio
         x, Fs = sf.read(audio_path)
         x = self.preprocess_audio(x, Fs)
@@ -42,10 +58,15 @@ class VoiceAuthenticator:
         # Extract basic features
         F, _ = ShortTermFeatures.feature_extraction(x, Fs, 0.050*Fs, 0.025*Fs)
         
+        # Compute the STFT once and share it between the librosa features
+        # (same defaults as librosa's y= path) and the liveness stage
+        S = np.abs(librosa.stft(x))
+        mel = librosa.feature.melspectrogram(S=S**2, sr=Fs)
+        
         # Extract additional features
-        mfccs = librosa.feature.mfcc(y=x, sr=Fs, n_mfcc=13)
-        spectral_centroid = librosa.feature.spectral_centroid(y=x, sr=Fs)[0]
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=x, sr=Fs)[0]
+        mfccs = librosa.feature.mfcc(S=librosa.power_to_db(mel), sr=Fs, n_mfcc=13)
+        spectral_centroid = librosa.feature.spectral_centroid(S=S, sr=Fs)[0]
+        spectral_rolloff = librosa.feature.spectral_rolloff(S=S, sr=Fs)[0]
         zero_crossing_rate = librosa.feature.zero_crossing_rate(x)[0]
         
         # Combine all features
@@ -57,7 +78,7 @@ class VoiceAuthenticator:
             np.array([np.mean(zero_crossing_rate)])  # Zero crossing rate
         ])
         
-        return features
+        return features, S, Fs
 
     def record_audio(self, output_path='input.wav', duration=5, fs=16000):
         print(f"Recording for {duration} seconds...")
@@ -115,8 +136,19 @@ class VoiceAuthenticator:
         except Exception:
             return self.base_threshold
 
-    def authenticate(self, username, audio_path='input.wav'):
+    def authenticate(self, username, audio_path='input.wav', timings=None):
+        # Pass a dict as timings to receive the seconds spent in each stage; they
+        # are per call, so concurrent sessions sharing one authenticator never mix
+        if timings is None:
+            timings = {}
+        try:
+            return self._authenticate(username, audio_path, timings)
+        finally:
+            logger.info("Stage timings for %s: %s", username, format_timings(timings))
+
+    def _authenticate(self, username, audio_path, timings):
         # Check if user exists
+        start = time.perf_counter()
         if not self.verify_user_exists(username):
             return False, "User not found"
 
@@ -124,14 +156,31 @@ class VoiceAuthenticator:
         with open(self.json_file, 'r') as f:
             data = json.load(f)
             user_data = data[username]
+        timings['load'] = time.perf_counter() - start
 
         # Verify passphrase
+        start = time.perf_counter()
         phrase = self.transcribe(audio_path)
+        timings['transcribe'] = time.perf_counter() - start
         if not self._text_matches(phrase.lower(), user_data['passphrase'].lower()):
             return False, "Passphrase mismatch"
 
-        # Extract and compare voice features
-        current_features = self.extract_features(audio_path)
+        # Extract voice features
+        start = time.perf_counter()
+        current_features, S, Fs = self._analyze(audio_path)
+        timings['features'] = time.perf_counter() - start
+
+        # Reject replays and synthetic audio before scoring the voiceprint
+        liveness_codes = None
+        if self.liveness_detector:
+            live, message, stats = self.liveness_detector.check(S, Fs, username)
+            timings['liveness'] = stats['elapsed']
+            if not live:
+                return False, message
+            liveness_codes = stats['codes']
+
+        # Compare voice features
+        start = time.perf_counter()
         stored_features = np.array(user_data['vector'])
         
         # Ensure both vectors have the same shape
@@ -146,8 +195,11 @@ class VoiceAuthenticator:
         
         # Get adaptive threshold
         threshold = self.get_adaptive_threshold(username)
+        timings['score'] = time.perf_counter() - start
         
         if sim >= threshold:
+            if liveness_codes is not None:
+                self.liveness_detector.remember(username, liveness_codes)
             return True, f"Voice match for user {username} (sim={sim:.2f})"
         else:
             return False, f"Voice mismatch for user {username} (sim={sim:.2f})"
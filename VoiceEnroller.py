@@ -7,6 +7,7 @@ import sounddevice as sd
 from pyAudioAnalysis import ShortTermFeatures
 from scipy.signal import butter, filtfilt
 import librosa
+from VoiceStore import get_store, VoiceStoreError
 
 class VoiceEnroller:
     def __init__(self, storage_path='voice_data'):
@@ -14,11 +15,10 @@ class VoiceEnroller:
         self.json_file = os.path.join(storage_path, 'voice_data.json')
         self.model = whisper.load_model("base", device="cpu")
         os.makedirs(storage_path, exist_ok=True)
+        self.store = get_store(self.json_file)
         
         # Initialize JSON file if it doesn't exist
-        if not os.path.exists(self.json_file):
-            with open(self.json_file, 'w') as f:
-                json.dump({}, f)
+        self.store.initialize()
 
     def preprocess_audio(self, audio_data, sample_rate):
         # Normalize audio
@@ -91,22 +91,14 @@ class VoiceEnroller:
         # Extract voice features
         voice_vector = self.extract_features(audio_path)
         
-        # Load existing data
+        # Add new user data; the store locks, merges and commits atomically
         try:
-            with open(self.json_file, 'r') as f:
-                data = json.load(f)
-        except json.JSONDecodeError:
-            data = {}
-        
-        # Add new user data
-        data[username] = {
-            'vector': voice_vector,
-            'passphrase': passphrase
-        }
-        
-        # Save updated data
-        with open(self.json_file, 'w') as f:
-            json.dump(data, f, indent=4)
+            self.store.put(username, {
+                'vector': voice_vector,
+                'passphrase': passphrase
+            })
+        except VoiceStoreError as e:
+            return False, str(e)
             
         return True, f"Successfully enrolled user: {username}"
 
@@ -0,0 +1,139 @@
+import os
+import json
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class VoiceStoreError(Exception):
+    pass
+
+class _FileLock:
+    # Cross-process exclusive lock held on a sidecar .lock file
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(self.fd, msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        os.close(self.fd)
+        self.fd = None
+
+def atomic_write_json(path, data, **kwargs):
+    # Write to a temp file in the same directory, fsync it, then rename over
+    # the target so readers only ever see the old or the new file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, **kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    # Persist the rename itself
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+class VoiceStore:
+    def __init__(self, json_file):
+        self.json_file = json_file
+        self.lock_file = json_file + '.lock'
+        self._cond = threading.Condition()
+        self._pending = []
+        self._committing = False
+
+    def load(self):
+        try:
+            with open(self.json_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            # Never treat a damaged roster as empty, or the next write wipes it
+            raise VoiceStoreError(f"Voice data file {self.json_file} is corrupted: {e}")
+
+    def initialize(self):
+        with _FileLock(self.lock_file):
+            if not os.path.exists(self.json_file):
+                atomic_write_json(self.json_file, {})
+
+    def put(self, username, record):
+        # Concurrent callers queue their update; whichever caller finds no commit
+        # in progress becomes the leader and writes the whole batch with one fsync
+        entry = {'username': username, 'record': record, 'done': False, 'error': None}
+        with self._cond:
+            self._pending.append(entry)
+            while not entry['done']:
+                if self._committing:
+                    self._cond.wait()
+                    continue
+
+                self._committing = True
+                batch, self._pending = self._pending, []
+                self._cond.release()
+                error = None
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    error = e
+                except BaseException:
+                    # Interrupts like KeyboardInterrupt stay with the leader's thread;
+                    # the rest of the batch only learns that it was not saved
+                    error = VoiceStoreError("Enrollment commit was interrupted")
+                    raise
+                finally:
+                    # Always release the followers, even if the leader is interrupted
+                    self._cond.acquire()
+                    self._committing = False
+                    for item in batch:
+                        item['done'] = True
+                        item['error'] = error
+                    self._cond.notify_all()
+
+        if entry['error'] is not None:
+            raise entry['error']
+
+    def _commit(self, batch):
+        # Read-modify-write under the cross-process lock so no other process's
+        # enrollment is lost between our read and our rename
+        with _FileLock(self.lock_file):
+            data = self.load()
+            for item in batch:
+                data[item['username']] = item['record']
+            atomic_write_json(self.json_file, data, indent=4)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(json_file):
+    # Share one store per file within a process so enrollments batch together
+    key = os.path.abspath(json_file)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = VoiceStore(json_file)
+        return _stores[key]
@@ -1,7 +1,8 @@
 import streamlit as st
 import os
 from VoiceEnroller import VoiceEnroller
-from VoiceAuthenticator import VoiceAuthenticator
+from VoiceAuthenticator import VoiceAuthenticator, format_timings
+from AuthProfiler import AuthProfiler, maybe_profile
 import time
 import tempfile
 import numpy as np
@@ -50,9 +51,14 @@ if 'temp_dir' not in st.session_state:
 if 'recording_status' not in st.session_state:
     st.session_state.recording_status = "Ready to record"
 
-# Initialize authenticator and enroller
-enroller = VoiceEnroller()
-authenticator = VoiceAuthenticator()
+# Initialize authenticator and enroller once per server process; caching keeps the
+# Whisper models and the liveness replay index alive across Streamlit reruns
+@st.cache_resource
+def load_models():
+    return VoiceEnroller(), VoiceAuthenticator()  # Liveness enabled with VOCALOCK_LIVENESS=1
+
+enroller, authenticator = load_models()
+profiler = AuthProfiler.from_env()  # Enabled with VOCALOCK_PROFILE=1
 
 def plot_audio_waveform(audio_path):
     # Read audio file
@@ -142,7 +148,9 @@ elif page == "Authenticate":
                     
                     # Authenticate user
                     with st.spinner("Verifying voice..."):
-                        success, message = authenticator.authenticate(username, audio_path)
+                        timings = {}
+                        success, message = maybe_profile(profiler, authenticator.authenticate, username, audio_path, timings=timings)
+                        st.caption(f"Stage timings: {format_timings(timings)}")
                         
                         if success:
                             st.success(message)
@@ -1,9 +1,11 @@
 import os
+import argparse
 import sounddevice as sd
 import soundfile as sf
 import numpy as np
 from VoiceEnroller import VoiceEnroller
-from VoiceAuthenticator import VoiceAuthenticator
+from VoiceAuthenticator import VoiceAuthenticator, format_timings
+from AuthProfiler import AuthProfiler, maybe_profile
 
 def record_audio(duration=5, sample_rate=16000):
     print(f"Recording for {duration} seconds...")
@@ -17,8 +19,16 @@ def save_audio(recording, filename, sample_rate=16000):
     print(f"Audio saved to {filename}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Vocal Lock command-line interface")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile authentication attempts (also enabled by VOCALOCK_PROFILE=1)")
+    parser.add_argument('--liveness', action='store_true',
+                        help="Reject replayed or played-back audio (also enabled by VOCALOCK_LIVENESS=1)")
+    args = parser.parse_args()
+    
     enroller = VoiceEnroller()
-    authenticator = VoiceAuthenticator()
+    authenticator = VoiceAuthenticator(liveness=args.liveness)
+    profiler = AuthProfiler.from_env(enabled=args.profile)
     
     while True:
         print("\n=== Voice Authentication System ===")
@@ -47,8 +57,10 @@ def main():
             recording = record_audio()
             save_audio(recording, "authentication.wav")
             
-            success, message = authenticator.authenticate(username, "authentication.wav")
+            timings = {}
+            success, message = maybe_profile(profiler, authenticator.authenticate, username, "authentication.wav", timings=timings)
             print(message)
+            print(f"Stage timings: {format_timings(timings)}")
             
         elif choice == "3":
             users = authenticator.list_users()
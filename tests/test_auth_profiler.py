@@ -0,0 +1,85 @@
+import os
+import shutil
+import threading
+
+import AuthProfiler as auth_profiler
+from AuthProfiler import AuthProfiler, maybe_profile
+
+def authenticate(username):
+    total = sum(i * i for i in range(20000))
+    return True, f"ok {username} {total > 0}"
+
+def _sampler_threads():
+    return [t for t in threading.enumerate() if isinstance(t, auth_profiler._StackSampler)]
+
+def test_maybe_profile_passes_through_without_profiler():
+    assert maybe_profile(None, authenticate, "alice") == (True, "ok alice True")
+
+def test_profiled_attempt_writes_bounded_output(tmp_path):
+    profiler = AuthProfiler(str(tmp_path), max_attempts=3, interval=0.001)
+    for _ in range(5):
+        assert maybe_profile(profiler, authenticate, "alice") == (True, "ok alice True")
+
+    files = os.listdir(tmp_path)
+    assert len([f for f in files if f.endswith('.prof')]) == 3
+    assert len([f for f in files if f.endswith('.folded')]) == 3
+    assert any('authenticate' in row[0] for row in profiler.top_functions(10))
+
+def test_output_dir_removed_during_attempt(tmp_path):
+    profiler = AuthProfiler(str(tmp_path / "profiles"))
+    os.makedirs(profiler.output_dir)
+
+    def removes_dir(username):
+        shutil.rmtree(profiler.output_dir)
+        return authenticate(username)
+
+    assert profiler.run(removes_dir, "alice") == (True, "ok alice True")
+
+def test_unwritable_output_does_not_fail_attempt(tmp_path, monkeypatch):
+    # A path under a regular file can never be created as a directory
+    (tmp_path / "blocker").write_text("not a directory")
+    monkeypatch.setenv('VOCALOCK_PROFILE', '1')
+    monkeypatch.setenv('VOCALOCK_PROFILE_DIR', str(tmp_path / "blocker" / "profiles"))
+
+    profiler = AuthProfiler.from_env()
+    assert profiler.run(authenticate, "alice") == (True, "ok alice True")
+    assert profiler.top_functions() == []
+
+def test_construction_does_not_touch_the_filesystem(tmp_path):
+    AuthProfiler(str(tmp_path / "profiles"))
+    assert not (tmp_path / "profiles").exists()
+
+def test_enable_failure_runs_unprofiled(tmp_path, monkeypatch):
+    def refuse(self):
+        raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(auth_profiler.cProfile.Profile, 'enable', refuse)
+    profiler = AuthProfiler(str(tmp_path))
+
+    assert profiler.run(authenticate, "alice") == (True, "ok alice True")
+    assert _sampler_threads() == []
+    assert os.listdir(tmp_path) == []
+    assert not auth_profiler._profiling.locked()
+
+def test_concurrent_attempts_are_serialised(tmp_path):
+    profiler = AuthProfiler(str(tmp_path))
+    started = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def slow(username):
+        started.set()
+        release.wait()
+        return authenticate(username)
+
+    first = threading.Thread(target=lambda: results.append(profiler.run(slow, "alice")))
+    first.start()
+    started.wait()
+    # The overlapping attempt runs unprofiled rather than failing
+    results.append(profiler.run(authenticate, "bob"))
+    release.set()
+    first.join()
+
+    assert sorted(results) == [(True, "ok alice True"), (True, "ok bob True")]
+    assert len([f for f in os.listdir(tmp_path) if f.endswith('.prof')]) == 1
+    assert _sampler_threads() == []
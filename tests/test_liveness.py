@@ -0,0 +1,160 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+signal = pytest.importorskip("scipy.signal")
+librosa = pytest.importorskip("librosa")
+
+from LivenessDetector import LivenessDetector
+
+SR = 16000
+
+def preprocess(x):
+    # The detector sees audio after VoiceAuthenticator.preprocess_audio; use the
+    # real method when its heavy imports are available, else the same steps
+    try:
+        from VoiceAuthenticator import VoiceAuthenticator
+    except ImportError:
+        x = x / np.max(np.abs(x))
+        b, a = signal.butter(4, [80 / (SR / 2), 3000 / (SR / 2)], btype='band')
+        x = signal.filtfilt(b, a, x)
+        return librosa.effects.trim(x, top_db=20)[0]
+    return VoiceAuthenticator.preprocess_audio(None, x, SR)
+
+def stft_magnitude(x):
+    # Same spectrogram VoiceAuthenticator._analyze hands to the detector
+    return np.abs(librosa.stft(preprocess(x)))
+
+def synthetic_speech(seed, duration=2.5, f0=140):
+    # Voiced harmonics under wandering formants with a syllable-rate envelope
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * SR)) / SR
+    f0_track = f0 * (1 + 0.15 * np.sin(2 * np.pi * rng.uniform(0.5, 1.5) * t + rng.uniform(0, 6)))
+    phase = 2 * np.pi * np.cumsum(f0_track) / SR
+    formants = [
+        rng.uniform(400, 800) + 200 * np.sin(2 * np.pi * rng.uniform(1, 3) * t + rng.uniform(0, 6)),
+        rng.uniform(1100, 1800) + 400 * np.sin(2 * np.pi * rng.uniform(1, 3) * t + rng.uniform(0, 6)),
+        rng.uniform(2300, 2800) + 150 * np.sin(2 * np.pi * rng.uniform(1, 3) * t),
+    ]
+    x = np.zeros_like(t)
+    for k in range(1, 30):
+        fk = k * f0_track
+        amplitude = sum(np.exp(-((fk - F) / 120) ** 2) for F in formants) + 0.3 / k
+        x += amplitude * (fk < 3500) * np.sin(k * phase)
+    x *= 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t + rng.uniform(0, 6)) ** 2
+    x += 0.003 * rng.normal(size=len(t))
+    return x / np.max(np.abs(x))
+
+def loudspeaker_playback(x, seed=0, noise=0.01, shift=0):
+    # A small speaker rolls off the low end; re-recording adds noise and misaligns frames
+    rng = np.random.default_rng(seed)
+    freqs = np.fft.rfftfreq(len(x), 1 / SR)
+    y = np.fft.irfft(np.fft.rfft(x) * (freqs / (freqs + 350)) ** 4, len(x))
+    y = np.roll(y, shift) + noise * rng.normal(size=len(y)) * np.max(np.abs(y))
+    return y / np.max(np.abs(y))
+
+@pytest.fixture
+def detector():
+    return LivenessDetector()
+
+def accept(detector, x, username="alice"):
+    live, message, stats = detector.check(stft_magnitude(x), SR, username)
+    assert live, message
+    detector.remember(username, stats['codes'])
+
+@pytest.mark.parametrize("seed,f0", [(1, 100), (2, 140), (3, 180), (4, 220), (5, 250), (7, 140), (8, 220)])
+def test_live_speech_passes(detector, seed, f0):
+    live, message, _ = detector.check(stft_magnitude(synthetic_speech(seed, f0=f0)), SR, "alice")
+    assert live, message
+
+@pytest.mark.parametrize("seed,f0", [(1, 100), (3, 180), (5, 250), (7, 140), (8, 220)])
+@pytest.mark.parametrize("noise", [0.003, 0.01, 0.03])
+def test_loudspeaker_playback_is_rejected(detector, seed, f0, noise):
+    played = loudspeaker_playback(synthetic_speech(seed, f0=f0), noise=noise)
+    live, message, stats = detector.check(stft_magnitude(played), SR, "alice")
+    assert not live
+    assert stats['low_ratio'] < detector.min_low_ratio
+
+@pytest.mark.parametrize("hum", [0, 1])
+def test_bandpassed_noise_is_rejected(detector, hum):
+    # After the 80-3000Hz bandpass the upper half of the spectrum is empty, so
+    # flatness must be measured in band for noise to stand out
+    rng = np.random.default_rng(hum)
+    t = np.arange(SR * 2) / SR
+    noise = rng.normal(size=len(t)) + hum * np.sin(2 * np.pi * 120 * t)
+    live, message, _ = detector.check(stft_magnitude(noise), SR, "alice")
+    assert not live
+    assert "flatness" in message
+
+@pytest.mark.parametrize("level", [0.05, 0.1])
+def test_speech_in_a_noisy_room_passes(detector, level):
+    x = synthetic_speech(3)
+    x = x + level * np.random.default_rng(0).normal(size=len(x))
+    live, message, _ = detector.check(stft_magnitude(x), SR, "alice")
+    assert live, message
+
+@pytest.mark.parametrize("noise", [0.02, 0.05, 0.1])
+def test_perturbed_replay_is_rejected(detector, noise):
+    x = synthetic_speech(1)
+    accept(detector, x)
+    S = stft_magnitude(x)
+    perturbed = S * (1 + noise * np.random.default_rng(7).normal(size=S.shape))
+    live, message, stats = detector.check(perturbed, SR, "alice")
+    assert not live
+    assert message.startswith("Replay detected")
+
+@pytest.mark.parametrize("shift", [0, 100, 256, 400])
+def test_rerecorded_replay_is_rejected(shift):
+    # Disable the channel cue so only the fingerprint match can reject the clip
+    detector = LivenessDetector(min_low_ratio=0)
+    x = synthetic_speech(1)
+    accept(detector, x)
+    replay = loudspeaker_playback(x, seed=shift, noise=0.03, shift=shift)
+    live, message, stats = detector.check(stft_magnitude(replay), SR, "alice")
+    assert not live
+    assert message.startswith("Replay detected")
+
+def test_fresh_utterances_are_not_replays(detector):
+    accept(detector, synthetic_speech(1))
+    for seed in (2, 3, 4):
+        live, message, stats = detector.check(stft_magnitude(synthetic_speech(seed)), SR, "alice")
+        assert live, message
+        assert stats['replay_ber'] >= detector.max_ber
+
+def test_replay_index_is_per_user(detector):
+    x = synthetic_speech(1)
+    accept(detector, x, "alice")
+    live, _, _ = detector.check(stft_magnitude(x), SR, "bob")
+    assert live
+
+def test_index_is_bounded(detector):
+    detector.max_clips = 3
+    for seed in range(5):
+        accept(detector, synthetic_speech(seed))
+    assert len(detector._codes) == 3
+    indexed = {clip_id for entries in detector._index.values() for clip_id, _ in entries}
+    assert indexed == set(detector._codes)
+
+def test_check_stays_within_budget(detector):
+    for seed in range(20):
+        accept(detector, synthetic_speech(seed, duration=5))
+    _, _, stats = detector.check(stft_magnitude(synthetic_speech(99, duration=5)), SR, "alice")
+    assert stats['elapsed'] < 0.01
+
+def test_bands_stop_at_fmax(detector):
+    # Energy above fmax must not leak into the last fingerprint band
+    S = np.zeros((1025, 4))
+    S[800:] = 1.0  # ~6250Hz and up
+    assert not detector._band_energies(S, SR).any()
+
+def test_bands_are_non_empty_when_narrow():
+    detector = LivenessDetector(n_bands=33, fmin=80, fmax=200)
+    E = detector._band_energies(np.ones((1025, 4)), SR)
+    assert E.shape == (33, 4)
+    assert (E > 0).all()
+
+def test_n_bands_fits_the_comparison_word():
+    with pytest.raises(ValueError):
+        LivenessDetector(n_bands=34)
+    detector = LivenessDetector(n_bands=33)
+    codes = np.array([(1 << 32) - 1] * 40)
+    assert detector._bit_error_rate(codes, np.zeros(40, dtype=np.int64), 0) == 1.0
@@ -0,0 +1,63 @@
+import multiprocessing as mp
+
+from RateLimiter import RateLimiter
+
+PROCESSES = 10
+ATTEMPTS = 30
+CAPACITY = 5
+
+def _hammer(db_path):
+    # No refill during the test, so the bucket can only admit CAPACITY attempts
+    limiter = RateLimiter(db_path, capacity=CAPACITY, refill_rate=1e-9)
+    admitted = 0
+    for _ in range(ATTEMPTS):
+        allowed, _ = limiter.acquire("alice", "door-1")
+        admitted += allowed
+    return admitted
+
+def test_bucket_is_shared_across_processes(tmp_path):
+    db_path = str(tmp_path / "rate_limit.db")
+    RateLimiter(db_path)
+    with mp.Pool(PROCESSES) as pool:
+        admitted = pool.map(_hammer, [db_path] * PROCESSES)
+    assert sum(admitted) == CAPACITY
+
+def test_source_bucket_limits_other_users(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rate_limit.db"), capacity=2, refill_rate=1e-9)
+    assert limiter.acquire("alice", "door-1")[0]
+    assert limiter.acquire("bob", "door-1")[0]
+    assert not limiter.acquire("carol", "door-1")[0]
+    assert limiter.acquire("carol", "door-2")[0]
+
+def test_lockout_after_max_failures(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rate_limit.db"), capacity=100,
+                          max_failures=3, lockout_time=300)
+    for _ in range(3):
+        assert limiter.acquire("bob", "door-1")[0]
+        limiter.record_result(False, "bob", "door-1")
+
+    allowed, message = limiter.acquire("bob", "door-1")
+    assert not allowed
+    assert message.startswith("Too many attempts")
+
+    # The look-ahead check agrees without spending a token
+    assert not limiter.check("bob", "door-1")[0]
+
+def test_lockout_is_seen_by_other_processes(tmp_path):
+    db_path = str(tmp_path / "rate_limit.db")
+    limiter = RateLimiter(db_path, capacity=100, max_failures=1)
+    limiter.acquire("bob", None)
+    limiter.record_result(False, "bob", None)
+    with mp.Pool(2) as pool:
+        results = pool.starmap(_check, [(db_path, "bob")] * 2)
+    assert results == [False, False]
+
+def _check(db_path, user_id):
+    return RateLimiter(db_path, capacity=100).check(user_id, None)[0]
+
+def test_check_does_not_spend_tokens(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rate_limit.db"), capacity=1, refill_rate=1e-9)
+    for _ in range(5):
+        assert limiter.check("alice", "door-1")[0]
+    assert limiter.acquire("alice", "door-1")[0]
+    assert not limiter.check("alice", "door-1")[0]
@@ -0,0 +1,114 @@
+import json
+import time
+import threading
+import multiprocessing as mp
+
+import pytest
+
+import VoiceStore
+from VoiceStore import VoiceStore as Store, VoiceStoreError, get_store
+
+PROCESSES = 8
+THREADS = 20
+
+def _enroll_many(json_file, process_index):
+    store = get_store(json_file)
+    store.initialize()
+    threads = [
+        threading.Thread(target=store.put, args=(
+            f"user-{process_index}-{i}", {'vector': [process_index, i], 'passphrase': 'open sesame'}
+        ))
+        for i in range(THREADS)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+def test_parallel_enrollers_lose_no_updates(tmp_path):
+    json_file = str(tmp_path / "voice_data.json")
+    processes = [mp.Process(target=_enroll_many, args=(json_file, i)) for i in range(PROCESSES)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+
+    with open(json_file) as f:
+        data = json.load(f)
+    expected = {f"user-{p}-{i}" for p in range(PROCESSES) for i in range(THREADS)}
+    assert set(data) == expected
+    assert data["user-3-7"] == {'vector': [3, 7], 'passphrase': 'open sesame'}
+
+def test_concurrent_puts_are_group_committed(tmp_path, monkeypatch):
+    commits = []
+    original = VoiceStore.atomic_write_json
+
+    def counting_write(*args, **kwargs):
+        commits.append(1)
+        original(*args, **kwargs)
+
+    monkeypatch.setattr(VoiceStore, 'atomic_write_json', counting_write)
+    store = Store(str(tmp_path / "voice_data.json"))
+    threads = [threading.Thread(target=store.put, args=(f"user-{i}", {})) for i in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(store.load()) == 50
+    assert len(commits) < 50
+
+def test_corrupted_roster_is_not_overwritten(tmp_path):
+    json_file = tmp_path / "voice_data.json"
+    json_file.write_text('{"alice": {"vector": [1,')
+    store = Store(str(json_file))
+    with pytest.raises(VoiceStoreError):
+        store.put("bob", {})
+    assert json_file.read_text() == '{"alice": {"vector": [1,'
+
+def test_interrupted_leader_releases_followers(tmp_path, monkeypatch):
+    store = Store(str(tmp_path / "voice_data.json"))
+    first_entered = threading.Event()
+    release_first = threading.Event()
+    original = store._commit
+    batches = []
+
+    def commit(batch):
+        batches.append([item['username'] for item in batch])
+        if len(batches) == 1:
+            # Hold the first commit so bob and carol queue up as one batch
+            first_entered.set()
+            release_first.wait()
+            return original(batch)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(store, '_commit', commit)
+    errors = {}
+
+    def enroll(username):
+        try:
+            store.put(username, {})
+        except BaseException as e:
+            errors[username] = e
+
+    alice = threading.Thread(target=enroll, args=("alice",))
+    alice.start()
+    first_entered.wait()
+    followers = [threading.Thread(target=enroll, args=(name,)) for name in ("bob", "carol")]
+    for t in followers:
+        t.start()
+    deadline = time.monotonic() + 5
+    while len(store._pending) < 2:
+        assert time.monotonic() < deadline, "bob and carol never queued behind alice"
+        time.sleep(0.001)
+    release_first.set()
+    for t in [alice] + followers:
+        t.join(5)
+        assert not t.is_alive()
+
+    assert sorted(batches[1]) == ["bob", "carol"]
+    assert "alice" not in errors
+    # The leader of the interrupted batch re-raises; the other writer is told it failed
+    kinds = sorted(type(e).__name__ for e in errors.values())
+    assert kinds == ["KeyboardInterrupt", "VoiceStoreError"]
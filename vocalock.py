@@ -9,7 +9,9 @@ from datetime import datetime
 import json
 import os
 from scipy.spatial.distance import cosine
-import time
+from RateLimiter import RateLimiter
+from VoiceStore import atomic_write_json
+from AuthProfiler import AuthProfiler, maybe_profile
 
 class VoiceEnroller:
     def __init__(self):
@@ -78,8 +80,13 @@ class AccessGateController:
         self.authenticator = VoiceAuthenticator()
         self.max_attempts = 3
         self.cooldown_time = 300  # 5 minutes in seconds
-        self.attempts = 0
-        self.last_attempt_time = 0
+        # Lockout state lives in a shared SQLite store so it survives Streamlit
+        # reruns and is enforced across every worker process
+        self.rate_limiter = RateLimiter(max_failures=self.max_attempts,
+                                        lockout_time=self.cooldown_time)
+        self.profiler = AuthProfiler.from_env()  # Enabled with VOCALOCK_PROFILE=1
+        # The door/device this process guards; used as the per-source rate-limit key
+        self.door_id = os.environ.get("VOCALOCK_DOOR_ID", "local")
         self.stored_data = None
         
     def load_stored_data(self):
@@ -94,8 +101,7 @@ class AccessGateController:
             "phrase": phrase,
             "voiceprint": voiceprint.tolist()
         }
-        with open("voice_data.json", "w") as f:
-            json.dump(data, f)
+        atomic_write_json("voice_data.json", data)
         self.stored_data = data
     
     def log_attempt(self, success):
@@ -103,35 +109,38 @@ class AccessGateController:
         with open("access_log.txt", "a") as f:
             f.write(f"{timestamp} - {'GRANTED' if success else 'DENIED'}\n")
     
-    def check_access(self, audio_data):
-        current_time = time.time()
-        
-        # Check cooldown
-        if self.attempts >= self.max_attempts:
-            if current_time - self.last_attempt_time < self.cooldown_time:
-                return False, "Too many attempts. Please wait."
-            self.attempts = 0
-        
-        self.last_attempt_time = current_time
-        
+    def check_access(self, audio_data, user_id="default", source_id=None):
+        if source_id is None:
+            source_id = self.door_id
         if not self.stored_data:
             return False, "No enrolled voice found"
         
-        success, similarity = self.authenticator.authenticate(audio_data, self.stored_data)
-        self.attempts += 1
+        # Reject throttled attempts before any audio processing
+        allowed, message = self.rate_limiter.acquire(user_id, source_id)
+        if not allowed:
+            self.log_attempt(False)
+            return False, message
+        
+        success, similarity = maybe_profile(self.profiler, self.authenticator.authenticate, audio_data, self.stored_data)
+        self.rate_limiter.record_result(success, user_id, source_id)
         
         if success:
-            self.attempts = 0
             self.log_attempt(True)
             return True, "Access Granted!"
         else:
             self.log_attempt(False)
             return False, "Access Denied"
 
+@st.cache_resource
+def load_controller():
+    # One controller per server process, so reruns and throttled clicks do not
+    # reload the Whisper model
+    return AccessGateController()
+
 def main():
     st.title("Vocalock - Voice Authentication System")
     
-    controller = AccessGateController()
+    controller = load_controller()
     controller.load_stored_data()
     
     # Sidebar for enrollment
@@ -153,10 +162,16 @@ def main():
             st.error("Please enroll a voice first")
             return
         
-        enroller = VoiceEnroller()
-        audio_data = enroller.record_audio()
+        # Refuse throttled callers before recording any audio
+        allowed, message = controller.rate_limiter.check("default", controller.door_id)
+        if not allowed:
+            st.error(message)
+            return
+        
+        # Reuse the controller's enroller rather than loading a second Whisper model
+        audio_data = controller.authenticator.enroller.record_audio()
         
-        success, message = controller.check_access(audio_data)
+        success, message = controller.check_access(audio_data, "default")
         if success:
             st.success(message)
         else: